@@ -1,6 +1,8 @@
 from fastapi import FastAPI, Response
 import asyncio
-from redis.asyncio import Redis
+import orjson
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.utils import HIREDIS_AVAILABLE
 import structlog
 import os
 
@@ -14,11 +16,11 @@ from opentelemetry.instrumentation.redis import RedisInstrumentor
 from app.processor.stream import start_stream_processor
 from app.metrics import get_metrics, get_content_type
 
-# Configure structured logging
+# Configure structured logging; orjson renders straight to bytes
 structlog.configure(
-    processors=[structlog.processors.JSONRenderer()],
+    processors=[structlog.processors.JSONRenderer(serializer=orjson.dumps)],
     wrapper_class=structlog.make_filtering_bound_logger(30),  # INFO level
-    logger_factory=structlog.PrintLoggerFactory(),
+    logger_factory=structlog.BytesLoggerFactory(),
     cache_logger_on_first_use=True,
 )
 
@@ -36,27 +38,59 @@ if otlp_endpoint := os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
 
 app = FastAPI(title="Fraud / MEV Monitor", version="0.1.0")
 
-# Instrument FastAPI and Redis
+# Instrument FastAPI; per-command Redis spans double the span count on the
+# rule hot path, so they are opt-in for debugging
 FastAPIInstrumentor.instrument_app(app)
-RedisInstrumentor().instrument()
+if os.getenv("OTEL_INSTRUMENT_REDIS"):
+    RedisInstrumentor().instrument()
 
 redis: Redis | None = None
+redis_bin: Redis | None = None
+
+
+def _redis_url() -> str:
+    """Prefer a colocated Redis UNIX socket over TCP when one is configured."""
+    if socket_path := os.getenv("REDIS_UDS"):
+        return f"unix://{socket_path}?db=0"
+    return os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+
+def _redis_client(decode_responses: bool = True) -> Redis:
+    """Build a Redis client, bounding its pool if REDIS_POOL_SIZE is set."""
+    url = _redis_url()
+    if pool_size := os.getenv("REDIS_POOL_SIZE"):
+        # Callers wait for a free connection instead of failing when the
+        # pool is exhausted
+        pool = BlockingConnectionPool.from_url(
+            url, max_connections=int(pool_size), decode_responses=decode_responses
+        )
+        return Redis.from_pool(pool)
+    return Redis.from_url(url, decode_responses=decode_responses)
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    global redis
-    redis = Redis.from_url("redis://redis:6379/0", decode_responses=True)
+    global redis, redis_bin
+    # redis-py silently falls back to its pure-Python reply parser
+    if not HIREDIS_AVAILABLE:
+        logger.warning("hiredis not installed, parsing Redis replies in Python")
+    redis = _redis_client()
     app.state.redis = redis
+    # The rule engine only needs counts, flags and bytes it scans itself, so
+    # its client skips decoding every reply into str
+    redis_bin = _redis_client(decode_responses=False)
+    app.state.redis_bin = redis_bin
 
     # Fire-and-forget background task
-    asyncio.create_task(start_stream_processor(app.state.redis))
+    asyncio.create_task(start_stream_processor(app.state.redis_bin))
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
     if redis:
         await redis.close()
+    if redis_bin:
+        await redis_bin.close()
 
 
 @app.get("/healthz")
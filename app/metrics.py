@@ -1,8 +1,6 @@
 """Prometheus metrics for the fraud monitor."""
 
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
-import time
-from typing import Dict, Any
 
 # Metrics
 tx_processed_total = Counter(
@@ -11,6 +9,10 @@ tx_processed_total = Counter(
 
 alerts_total = Counter("alerts_total", "Total alerts generated", ["rule"])
 
+tx_unknown_type_total = Counter(
+    "tx_unknown_type_total", "Transactions with no rule for their type"
+)
+
 rule_evaluation_duration = Histogram(
     "rule_evaluation_duration_seconds",
     "Time spent evaluating rules",
@@ -18,7 +20,7 @@ rule_evaluation_duration = Histogram(
 )
 
 
-def get_metrics() -> str:
+def get_metrics() -> bytes:
     """Return Prometheus metrics in text format."""
     return generate_latest()
 
@@ -26,21 +28,3 @@ def get_metrics() -> str:
 def get_content_type() -> str:
     """Return the content type for Prometheus metrics."""
     return CONTENT_TYPE_LATEST
-
-
-class MetricsTimer:
-    """Context manager for timing operations."""
-
-    def __init__(self, histogram: Histogram, labels: Dict[str, Any]):
-        self.histogram = histogram
-        self.labels = labels
-        self.start_time = None
-
-    def __enter__(self):
-        self.start_time = time.time()
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.start_time:
-            duration = time.time() - self.start_time
-            self.histogram.labels(**self.labels).observe(duration)
@@ -0,0 +1,44 @@
+"""Typed mempool transactions consumed by the rule engine."""
+
+from typing import cast
+
+import msgspec
+
+
+class Transaction(msgspec.Struct, kw_only=True, tag_field="type", gc=False):
+    """Fields shared by every mempool transaction.
+
+    Records only hold scalars and strings, so they cannot form reference
+    cycles; ``gc=False`` keeps them out of the cyclic garbage collector.
+    """
+
+    hash: str
+    value: float = 0.0
+    from_: str = msgspec.field(default="", name="from")
+    to: str = ""
+
+
+class ApproveTx(Transaction, tag="approve"):
+    """ERC-20 style allowance approval."""
+
+    token_address: str = ""
+    allowance: int | float = 0
+
+
+class SwapTx(Transaction, tag="swap"):
+    """DEX swap on a token pair."""
+
+    token_pair: str = ""
+    direction: str = ""
+    amount_in: float = 0.0
+    amount_out: float = 0.0
+
+
+class TransferTx(Transaction, tag="transfer"):
+    """Plain value transfer."""
+
+
+def tx_type(tx: Transaction) -> str:
+    """Return the wire ``type`` tag of a transaction, e.g. ``"approve"``."""
+    # Every concrete subclass declares a string tag
+    return cast(str, tx.__struct_config__.tag)
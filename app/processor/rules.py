@@ -1,10 +1,23 @@
 from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
 import structlog
 from opentelemetry import trace
+from opentelemetry.trace import Span, format_trace_id
+from collections.abc import Awaitable, Callable
+from contextlib import AbstractContextManager, nullcontext
+from functools import lru_cache
+from itertools import islice
+from typing import Any, cast
+from cachetools import TTLCache
+import xxhash
+import asyncio
 import hashlib
+import heapq
+import os
 import time
 
-from app.metrics import alerts_total, rule_evaluation_duration, MetricsTimer
+from app.metrics import alerts_total, rule_evaluation_duration, tx_unknown_type_total
+from app.processor.models import ApproveTx, SwapTx, Transaction, TransferTx, tx_type
 
 RULE_ID_SUSPICIOUS_APPROVAL = "suspicious_approval"
 RULE_ID_SANDWICH_RISK = "sandwich_risk"
@@ -13,197 +26,530 @@ RULE_ID_ANOMALOUS_TRANSFER = "anomalous_transfer"
 logger = structlog.get_logger()
 tracer = trace.get_tracer(__name__)
 
+# Per-rule spans are only worth their cost when something exports them
+_TRACING_ENABLED = bool(os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"))
+
 # Risky token addresses (mock data)
-RISKY_TOKENS = {
-    "0x1234567890abcdef1234567890abcdef12345678",  # Mock risky token
-    "0xabcdef1234567890abcdef1234567890abcdef12",  # Another mock risky token
-}
+RISKY_TOKENS: frozenset[str] = frozenset(
+    {
+        "0x1234567890abcdef1234567890abcdef12345678",  # Mock risky token
+        "0xabcdef1234567890abcdef1234567890abcdef12",  # Another mock risky token
+    }
+)
+
+# Lower-cased lookup set, built once at import instead of per approval tx
+_RISKY_TOKENS_LC = frozenset(addr.lower() for addr in RISKY_TOKENS)
 
 # Large allowance threshold (in wei, ~1000 ETH equivalent)
 LARGE_ALLOWANCE_THRESHOLD = 1000 * 10**18
 
+# Sandwich detection looks at the latest swaps on a pair within this window
+SWAP_WINDOW_SECONDS = 30
+SWAP_HISTORY_LEN = 10  # Only the latest swaps can form a sandwich
+
+# Fan-out detection counts a sender's unique recipients within this window
+TRANSFER_WINDOW_SECONDS = 5
+MAX_TRANSFER_RECIPIENTS = 10  # Threshold for anomalous fan-out
+
+# Hot pairs and senders can be spread over several keys, and so cluster slots:
+# each tx writes to one shard and reads fan out over all of them
+KEY_SHARDS = int(os.getenv("RULE_KEY_SHARDS", "1"))
+if KEY_SHARDS < 1:
+    raise ValueError(f"RULE_KEY_SHARDS must be at least 1, got {KEY_SHARDS}")
+
+# Fixed script arguments, encoded once rather than by redis-py on every call
+_SWAP_WINDOW_ARGS = (b"%d" % SWAP_WINDOW_SECONDS, b"%d" % SWAP_HISTORY_LEN)
+_TRANSFER_WINDOW_ARGS = (
+    b"%d" % TRANSFER_WINDOW_SECONDS,
+    b"%d" % MAX_TRANSFER_RECIPIENTS,
+)
+
+# Metric children bound once so the hot path skips per-tx label resolution
+_APPROVAL_DURATION = rule_evaluation_duration.labels(
+    rule=RULE_ID_SUSPICIOUS_APPROVAL, result="evaluated"
+)
+_SANDWICH_DURATION = rule_evaluation_duration.labels(
+    rule=RULE_ID_SANDWICH_RISK, result="evaluated"
+)
+_TRANSFER_DURATION = rule_evaluation_duration.labels(
+    rule=RULE_ID_ANOMALOUS_TRANSFER, result="evaluated"
+)
+_APPROVAL_ALERTS = alerts_total.labels(rule=RULE_ID_SUSPICIOUS_APPROVAL)
+_SANDWICH_ALERTS = alerts_total.labels(rule=RULE_ID_SANDWICH_RISK)
+_TRANSFER_ALERTS = alerts_total.labels(rule=RULE_ID_ANOMALOUS_TRANSFER)
+
+# Sliding-window updates run server-side so each costs one EVALSHA round trip
+# instead of one per command, and the add/expire/read sequence is atomic.
+# Unique recipients are estimated with a fixed-size HyperLogLog rather than an
+# exact set, capped by the sender's transfer count so crafted recipients cannot
+# inflate the estimate past the number of transfers actually seen.
+# KEYS[1] = sender HLL, KEYS[2] = sender transfer counter;
+# ARGV = recipient (empty to only read the count), window seconds,
+# max recipients.
+# Returns {unique recipients, 1 if above the threshold else 0}, or {0, 0}
+# without counting when PFADD left the estimate unchanged: a repeat
+# cannot push the sender over the threshold.
+_TRANSFER_WINDOW_LUA = """
+local transfers
+if ARGV[1] ~= '' then
+    transfers = redis.call('INCR', KEYS[2])
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+    local added = redis.call('PFADD', KEYS[1], ARGV[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    if added == 0 then
+        return {0, 0}
+    end
+else
+    transfers = tonumber(redis.call('GET', KEYS[2])) or 0
+end
+local count = math.min(redis.call('PFCOUNT', KEYS[1]), transfers)
+if count > tonumber(ARGV[3]) then
+    return {count, 1}
+end
+return {count, 0}
+"""
+# Swaps go into a capped newest-first list, so trimming and reading are O(K)
+# in the history length however busy the pair is.
+# KEYS[1] = swap key; ARGV = swap data (empty to only read), current time,
+# window seconds, history length. Returns the kept swaps recorded within the
+# window.
+_SWAP_WINDOW_LUA = """
+local now = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local history = tonumber(ARGV[4])
+if ARGV[1] ~= '' then
+    redis.call('LPUSH', KEYS[1], ARGV[1])
+    redis.call('LTRIM', KEYS[1], 0, history - 1)
+    redis.call('EXPIRE', KEYS[1], window)
+end
+local recent = {}
+for _, swap in ipairs(redis.call('LRANGE', KEYS[1], 0, history - 1)) do
+    if tonumber(string.match(swap, '(%d+)$')) < now - window then
+        break
+    end
+    recent[#recent + 1] = swap
+end
+return recent
+"""
+_TRANSFER_WINDOW_SHA = hashlib.sha1(_TRANSFER_WINDOW_LUA.encode()).hexdigest()
+_SWAP_WINDOW_SHA = hashlib.sha1(_SWAP_WINDOW_LUA.encode()).hexdigest()
+
+
+async def evaluate_rules(tx: Transaction, redis: Redis) -> None:
+    """Run the rules that apply to the transaction's type."""
+    # Each rule only handles one tx type, so dispatch straight to the
+    # matching ones rather than calling every rule and letting the others
+    # bail out
+    rules = _RULES_BY_TYPE.get(type(tx))
+    if rules is None:
+        tx_unknown_type_total.inc()
+        return
 
-async def evaluate_rules(tx: dict, redis: Redis) -> None:
-    """Run all rule functions against a transaction."""
     with tracer.start_as_current_span("evaluate_rules") as span:
-        span.set_attribute("tx.hash", tx.get("hash", ""))
-        span.set_attribute("tx.type", tx.get("type", ""))
-
-        # Run all rules in parallel for better performance
-        await _approval_rule(tx, redis)
-        await _sandwich_risk_rule(tx, redis)
-        await _anomalous_transfer_rule(tx, redis)
+        span.set_attribute("tx.hash", tx.hash)
+        span.set_attribute("tx.type", tx_type(tx))
+
+        if len(rules) == 1:
+            await rules[0](tx, redis)
+        elif rules:
+            # Rules are independent, so overlap their Redis round trips; let
+            # every rule finish before surfacing the first failure
+            results = await asyncio.gather(
+                *(rule(tx, redis) for rule in rules), return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
 
 
-async def _approval_rule(tx: dict, redis: Redis) -> None:
+async def _approval_rule(tx: Transaction, redis: Redis) -> None:
     """Fire an alert when an unusually large approval is seen."""
-    if tx["type"] != "approve":
+    if not isinstance(tx, ApproveTx):
         return
 
-    with tracer.start_as_current_span("approval_rule") as span:
+    with _rule_span("approval_rule") as span:
         span.set_attribute("rule.id", RULE_ID_SUSPICIOUS_APPROVAL)
 
-        with MetricsTimer(
-            rule_evaluation_duration,
-            {"rule": RULE_ID_SUSPICIOUS_APPROVAL, "result": "evaluated"},
-        ):
-            alert_id = _generate_alert_id(RULE_ID_SUSPICIOUS_APPROVAL, tx["hash"])
-
-            # Idempotency key – avoid flooding
-            exists = await redis.get(alert_id)
-            if exists:
-                span.set_attribute("result", "duplicate")
-                return
-
+        with _APPROVAL_DURATION.time():
             # Enhanced logic: check for large allowances and risky tokens
             should_alert = False
             reasons = []
 
             # Check for large allowance
-            allowance = tx.get("allowance", 0)
+            allowance = tx.allowance
             if allowance > LARGE_ALLOWANCE_THRESHOLD:
                 should_alert = True
                 reasons.append(f"large_allowance:{allowance}")
 
             # Check for risky token
-            token_address = tx.get("token_address", "")
-            if token_address.lower() in {addr.lower() for addr in RISKY_TOKENS}:
+            token_address = tx.token_address
+            if token_address.lower() in _RISKY_TOKENS_LC:
                 should_alert = True
                 reasons.append(f"risky_token:{token_address}")
 
             if should_alert:
-                alert_msg = f"[ALERT] Suspicious approval tx {tx['hash']} - {', '.join(reasons)}"
+                tx_hash = tx.hash
+                alert_id = _generate_alert_id(RULE_ID_SUSPICIOUS_APPROVAL, tx_hash)
+
+                if not await _claim_alert(redis, alert_id):
+                    span.set_attribute("result", "duplicate")
+                    return
+
                 logger.warning(
-                    alert_msg,
-                    trace_id=span.get_span_context().trace_id,
+                    "[ALERT] Suspicious approval",
+                    trace_id=format_trace_id(span.get_span_context().trace_id),
                     rule_id=RULE_ID_SUSPICIOUS_APPROVAL,
-                    tx_hash=tx["hash"],
+                    tx_hash=tx_hash,
                     reasons=reasons,
                 )
 
-                alerts_total.labels(rule=RULE_ID_SUSPICIOUS_APPROVAL).inc()
-                await redis.set(alert_id, "1", ex=60)  # suppress for 60 s
+                _APPROVAL_ALERTS.inc()
                 span.set_attribute("result", "alert_fired")
             else:
                 span.set_attribute("result", "no_alert")
 
 
-async def _sandwich_risk_rule(tx: dict, redis: Redis) -> None:
+async def _sandwich_risk_rule(tx: Transaction, redis: Redis) -> None:
     """Detect potential sandwich attack patterns."""
-    if tx["type"] != "swap":
+    if not isinstance(tx, SwapTx):
         return
 
-    with tracer.start_as_current_span("sandwich_risk_rule") as span:
+    with _rule_span("sandwich_risk_rule") as span:
         span.set_attribute("rule.id", RULE_ID_SANDWICH_RISK)
 
-        with MetricsTimer(
-            rule_evaluation_duration,
-            {"rule": RULE_ID_SANDWICH_RISK, "result": "evaluated"},
-        ):
+        with _SANDWICH_DURATION.time():
             # Look for complementary swaps within a time window
-            token_pair = tx.get("token_pair", "")
+            token_pair = tx.token_pair
             if not token_pair:
                 return
 
-            swap_key = f"swaps:{token_pair}"
-            window_seconds = 30
+            swap_keys = _swap_keys(token_pair)
+            tx_hash = tx.hash
 
             # Store this swap with timestamp
-            current_time = int(time.time())
-            swap_data = f"{tx['hash']}:{tx.get('direction', '')}:{current_time}"
-
-            # Add to sorted set for time-based queries
-            await redis.zadd(swap_key, {swap_data: current_time})
-            await redis.expire(swap_key, window_seconds)
-
-            # Get recent swaps for this pair
-            recent_swaps = await redis.zrangebyscore(
-                swap_key, current_time - window_seconds, current_time
-            )
+            current_time = _now_seconds()
+            # Direction first, so the history scan reads a single character
+            swap_data = f"{tx.direction[:1]}|{tx_hash}|{current_time}"
+
+            # Push onto the pair's capped history and read back the recent
+            # swaps for this pair in a single round trip
+            if len(swap_keys) == 1:
+                recent_swaps = await _eval_script(
+                    redis,
+                    _SWAP_WINDOW_LUA,
+                    _SWAP_WINDOW_SHA,
+                    swap_keys,
+                    swap_data,
+                    current_time,
+                    *_SWAP_WINDOW_ARGS,
+                )
+            else:
+                recent_swaps = await _fan_out_swaps(
+                    redis, swap_keys, _shard_of(tx_hash), swap_data, current_time
+                )
 
             # Analyze for sandwich pattern
             if len(recent_swaps) >= 3:
                 # Simple heuristic: if we have 3+ swaps in the same pair within window
                 # and they alternate direction, flag potential sandwich
-                directions = [
-                    swap.split(":")[1] for swap in recent_swaps if ":" in swap
-                ]
-
-                if len(set(directions)) > 1:  # Multiple directions present
-                    alert_id = _generate_alert_id(RULE_ID_SANDWICH_RISK, tx["hash"])
-
-                    exists = await redis.get(alert_id)
-                    if not exists:
-                        alert_msg = f"[ALERT] Potential sandwich attack pattern tx {tx['hash']} - {len(recent_swaps)} swaps in {window_seconds}s"
-                        logger.warning(
-                            alert_msg,
-                            trace_id=span.get_span_context().trace_id,
-                            rule_id=RULE_ID_SANDWICH_RISK,
-                            tx_hash=tx["hash"],
-                            swap_count=len(recent_swaps),
-                        )
-
-                        alerts_total.labels(rule=RULE_ID_SANDWICH_RISK).inc()
-                        await redis.set(alert_id, "1", ex=60)
-                        span.set_attribute("result", "alert_fired")
+                if _has_mixed_directions(recent_swaps):
+                    alert_id = _generate_alert_id(RULE_ID_SANDWICH_RISK, tx_hash)
+
+                    if not await _claim_alert(redis, alert_id):
+                        span.set_attribute("result", "duplicate")
                         return
 
+                    logger.warning(
+                        "[ALERT] Potential sandwich attack pattern",
+                        trace_id=format_trace_id(span.get_span_context().trace_id),
+                        rule_id=RULE_ID_SANDWICH_RISK,
+                        tx_hash=tx_hash,
+                        swap_count=len(recent_swaps),
+                        window_seconds=SWAP_WINDOW_SECONDS,
+                    )
+
+                    _SANDWICH_ALERTS.inc()
+                    span.set_attribute("result", "alert_fired")
+                    return
+
             span.set_attribute("result", "no_alert")
 
 
-async def _anomalous_transfer_rule(tx: dict, redis: Redis) -> None:
+async def _anomalous_transfer_rule(tx: Transaction, redis: Redis) -> None:
     """Detect anomalous transfer patterns (fan-out to many recipients)."""
-    if tx["type"] != "transfer":
+    if not isinstance(tx, TransferTx):
         return
 
-    with tracer.start_as_current_span("anomalous_transfer_rule") as span:
+    with _rule_span("anomalous_transfer_rule") as span:
         span.set_attribute("rule.id", RULE_ID_ANOMALOUS_TRANSFER)
 
-        with MetricsTimer(
-            rule_evaluation_duration,
-            {"rule": RULE_ID_ANOMALOUS_TRANSFER, "result": "evaluated"},
-        ):
-            sender = tx.get("from", "")
-            recipient = tx.get("to", "")
+        with _TRANSFER_DURATION.time():
+            sender = tx.from_
+            recipient = tx.to
 
             if not sender or not recipient:
                 return
 
             # Track unique recipients for each sender in a 5-second window
-            sender_key = f"transfers:{sender}"
-            window_seconds = 5
-            max_recipients = 10  # Threshold for anomalous fan-out
-
-            # Add recipient to sender's recent recipients
-            await redis.sadd(sender_key, recipient)
-            await redis.expire(sender_key, window_seconds)
+            shard_keys = _transfer_keys(sender)
+
+            # Add recipient to sender's recent recipients and count unique
+            # recipients in a single round trip
+            if len(shard_keys) == 1:
+                recipient_count, fan_out = await _eval_script(
+                    redis,
+                    _TRANSFER_WINDOW_LUA,
+                    _TRANSFER_WINDOW_SHA,
+                    shard_keys[0],
+                    recipient,
+                    *_TRANSFER_WINDOW_ARGS,
+                )
+            else:
+                recipient_count, fan_out = await _fan_out_transfers(
+                    redis, shard_keys, _shard_of(recipient), recipient
+                )
 
-            # Count unique recipients
-            recipient_count = await redis.scard(sender_key)
+            if fan_out:
+                tx_hash = tx.hash
+                alert_id = _generate_alert_id(RULE_ID_ANOMALOUS_TRANSFER, tx_hash)
 
-            if recipient_count > max_recipients:
-                alert_id = _generate_alert_id(RULE_ID_ANOMALOUS_TRANSFER, tx["hash"])
+                if not await _claim_alert(redis, alert_id):
+                    span.set_attribute("result", "duplicate")
+                    return
 
-                exists = await redis.get(alert_id)
-                if not exists:
-                    alert_msg = f"[ALERT] Anomalous transfer pattern tx {tx['hash']} - {recipient_count} unique recipients in {window_seconds}s"
-                    logger.warning(
-                        alert_msg,
-                        trace_id=span.get_span_context().trace_id,
-                        rule_id=RULE_ID_ANOMALOUS_TRANSFER,
-                        tx_hash=tx["hash"],
-                        sender=sender,
-                        recipient_count=recipient_count,
-                    )
+                logger.warning(
+                    "[ALERT] Anomalous transfer pattern",
+                    trace_id=format_trace_id(span.get_span_context().trace_id),
+                    rule_id=RULE_ID_ANOMALOUS_TRANSFER,
+                    tx_hash=tx_hash,
+                    sender=sender,
+                    recipient_count=recipient_count,
+                    window_seconds=TRANSFER_WINDOW_SECONDS,
+                )
 
-                    alerts_total.labels(rule=RULE_ID_ANOMALOUS_TRANSFER).inc()
-                    await redis.set(alert_id, "1", ex=60)
-                    span.set_attribute("result", "alert_fired")
-                    return
+                _TRANSFER_ALERTS.inc()
+                span.set_attribute("result", "alert_fired")
+                return
 
             span.set_attribute("result", "no_alert")
 
 
-def _generate_alert_id(rule_id: str, tx_hash: str) -> str:
+_Rule = Callable[[Transaction, Redis], Awaitable[None]]
+
+_RULES_BY_TYPE: dict[type[Transaction], tuple[_Rule, ...]] = {
+    ApproveTx: (_approval_rule,),
+    SwapTx: (_sandwich_risk_rule,),
+    TransferTx: (_anomalous_transfer_rule,),
+}
+
+
+# Window keys repeat across txs (few token pairs, hot senders), so build and
+# encode each once; redis-py passes bytes through without re-encoding. The
+# caches are bounded so a stream of fresh senders cannot grow them
+@lru_cache(maxsize=1024)
+def _swap_keys(token_pair: str) -> tuple[bytes, ...]:
+    """Return the sliding-window keys for a token pair's swaps, one per shard.
+
+    The swap script touches a single key, so no hash tag is needed; tagging
+    the shard number would put the same shard of every pair on one slot.
+    """
+    if KEY_SHARDS == 1:
+        return (b"swaps:" + token_pair.encode(),)
+    return tuple(f"swaps:{token_pair}:{shard}".encode() for shard in range(KEY_SHARDS))
+
+
+@lru_cache(maxsize=10_000)
+def _transfer_keys(sender: str) -> tuple[tuple[bytes, bytes], ...]:
+    """Return each shard's recipient HLL and transfer counter keys for a sender.
+
+    The window script touches both keys of a shard, so a hash tag keeps them
+    in the same cluster slot.
+    """
+    tags: tuple[str, ...]
+    if KEY_SHARDS == 1:
+        tags = (sender,)
+    else:
+        tags = tuple(f"{sender}:{shard}" for shard in range(KEY_SHARDS))
+    return tuple(
+        (f"transfers:{{{tag}}}".encode(), f"transfers:n:{{{tag}}}".encode())
+        for tag in tags
+    )
+
+
+def _shard_of(value: str) -> int:
+    """Pick the shard a tx writes to, stable for a given value."""
+    return xxhash.xxh3_64_intdigest(value.encode()) % KEY_SHARDS
+
+
+async def _fan_out_swaps(
+    redis: Redis, keys: tuple[bytes, ...], own: int, swap_data: str, now: int
+) -> list[Any]:
+    """Record a swap on its own shard and gather every shard's recent swaps.
+
+    Each shard is newest-first and capped on its own, so the merged history
+    is cut back to the newest ``SWAP_HISTORY_LEN`` swaps across all shards.
+    """
+    shards = await asyncio.gather(
+        *(
+            _eval_script(
+                redis,
+                _SWAP_WINDOW_LUA,
+                _SWAP_WINDOW_SHA,
+                (key,),
+                swap_data if shard == own else b"",
+                now,
+                *_SWAP_WINDOW_ARGS,
+            )
+            for shard, key in enumerate(keys)
+        )
+    )
+    merged = heapq.merge(*shards, key=_swap_time, reverse=True)
+    return list(islice(merged, SWAP_HISTORY_LEN))
+
+
+def _swap_time(swap: bytes | str) -> int:
+    """Return the timestamp that ends a ``<d>|<hash>|<ts>`` swap entry."""
+    if isinstance(swap, bytes):
+        return int(swap.rpartition(b"|")[2])
+    return int(swap.rpartition("|")[2])
+
+
+async def _fan_out_transfers(
+    redis: Redis,
+    shard_keys: tuple[tuple[bytes, bytes], ...],
+    own: int,
+    recipient: str,
+) -> tuple[int, bool]:
+    """Record a recipient on its own shard and total unique recipients.
+
+    Recipients are sharded by address, so shards never share one and their
+    counts add up.
+    """
+    counts = await asyncio.gather(
+        *(
+            _eval_script(
+                redis,
+                _TRANSFER_WINDOW_LUA,
+                _TRANSFER_WINDOW_SHA,
+                keys,
+                recipient if shard == own else b"",
+                *_TRANSFER_WINDOW_ARGS,
+            )
+            for shard, keys in enumerate(shard_keys)
+        )
+    )
+    if not counts[own][0]:
+        # Repeat recipient: the script skipped counting its shard
+        return 0, False
+    total = sum(count for count, _ in counts)
+    return total, total > MAX_TRANSFER_RECIPIENTS
+
+
+# Leading direction byte of stored swap entries, per reply type; indexing
+# bytes yields ints, so the bytes markers are code points
+_BYTES_DIRECTIONS = (ord("b"), ord("s"))
+_STR_DIRECTIONS = ("b", "s")
+
+
+# Wall-clock seconds, refreshed at most every _CLOCK_REFRESH monotonic seconds
+_CLOCK_REFRESH = 0.1
+_cached_now = 0
+_cached_at = float("-inf")
+
+
+def _now_seconds() -> int:
+    """Return the current Unix time in whole seconds, cached for 100 ms."""
+    global _cached_now, _cached_at
+    mono = time.monotonic()
+    if mono - _cached_at > _CLOCK_REFRESH:
+        _cached_now = int(time.time())
+        _cached_at = mono
+    return _cached_now
+
+
+def _rule_span(name: str) -> AbstractContextManager[Span]:
+    """Start a rule span, or reuse the current one when tracing is not exported.
+
+    Reusing the enclosing span keeps alert logs correlated with the
+    ``evaluate_rules`` trace even when per-rule spans are skipped; the rule's
+    attributes then land on that span.
+    """
+    if _TRACING_ENABLED:
+        return tracer.start_as_current_span(name)
+    return nullcontext(trace.get_current_span())
+
+
+def _has_mixed_directions(swaps: list[bytes] | list[str]) -> bool:
+    """Return True if both buy and sell swaps appear in ``<d>|<hash>|<ts>``.
+
+    Entries lead with their direction's first letter, so only that one
+    character is read, and the scan stops as soon as both are seen. Works on
+    raw ``bytes`` replies as well as decoded ``str`` ones.
+    """
+    if not swaps:
+        return False
+    buy, sell = _BYTES_DIRECTIONS if isinstance(swaps[0], bytes) else _STR_DIRECTIONS
+    seen_buy = seen_sell = False
+    for swap in swaps:
+        if not swap:
+            continue
+        head = swap[0]
+        if head == buy:
+            seen_buy = True
+        elif head == sell:
+            seen_sell = True
+        else:
+            continue
+        if seen_buy and seen_sell:
+            return True
+    return False
+
+
+async def load_scripts(redis: Redis) -> None:
+    """Register the sliding-window Lua scripts with the Redis server."""
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.script_load(_SWAP_WINDOW_LUA)
+        pipe.script_load(_TRANSFER_WINDOW_LUA)
+        await pipe.execute()
+
+
+async def _eval_script(
+    redis: Redis, script: str, sha: str, keys: tuple[bytes, ...], *args: Any
+) -> Any:
+    """Run a cached Lua script against its keys, loading it on first miss."""
+    # redis-py types keys as str and the reply as sync-or-async; the asyncio
+    # client accepts bytes keys and always returns an awaitable
+    evalsha = cast(Callable[..., Awaitable[Any]], redis.evalsha)
+    try:
+        return await evalsha(sha, len(keys), *keys, *args)
+    except NoScriptError:
+        # Script cache was flushed or Redis restarted since load_scripts()
+        await redis.script_load(script)
+        return await evalsha(sha, len(keys), *keys, *args)
+
+
+# Alert IDs this process claimed within the Redis key TTL; repeats of a tx we
+# just alerted on are dropped without a round trip
+_recent_alerts: TTLCache[bytes, bool] = TTLCache(maxsize=10_000, ttl=60)
+
+
+async def _claim_alert(redis: Redis, alert_id: bytes) -> bool:
+    """Claim an alert's idempotency key, suppressing repeats for 60 s.
+
+    SET NX doubles as the duplicate check, so claiming costs one round trip
+    and cannot race with another worker between check and write. IDs already
+    claimed by this process are rejected locally before reaching Redis.
+    """
+    if alert_id in _recent_alerts:
+        return False
+    if not await redis.set(alert_id, b"1", ex=60, nx=True):
+        return False
+    _recent_alerts[alert_id] = True
+    return True
+
+
+def _generate_alert_id(rule_id: str, tx_hash: str) -> bytes:
     """Generate a deterministic alert ID for idempotency."""
-    return hashlib.sha256(f"{rule_id}:{tx_hash}".encode()).hexdigest()[:16]
+    # Non-cryptographic: the ID only needs to be stable and well spread.
+    # Formatted straight to bytes, as it is only ever used as a Redis key
+    return b"%016x" % xxhash.xxh3_64_intdigest(f"{rule_id}:{tx_hash}".encode())
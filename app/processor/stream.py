@@ -1,94 +1,162 @@
 import asyncio
-import random
-from typing import AsyncIterator
+from typing import AsyncIterator, Iterator
+import numpy as np
 import structlog
 from opentelemetry import trace
 
 from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
-from app.processor.rules import evaluate_rules
+from app.processor.models import ApproveTx, SwapTx, Transaction, TransferTx, tx_type
+from app.processor.rules import evaluate_rules, load_scripts
 from app.metrics import tx_processed_total
 
-MOCK_TX_TYPES = ["swap", "approve", "transfer"]
-
 logger = structlog.get_logger()
 tracer = trace.get_tracer(__name__)
 
 # Mock data for more realistic transactions
+MOCK_TX_TYPES = (SwapTx, ApproveTx, TransferTx)
 
+MOCK_ADDRESSES = (
+    "0x742637a99b4b5a1a7c0b7c6b4ae6e8b8b73c7d8e",
+    "0xa1b2c3d4e5f6789012345678901234567890abcd",
+    "0xdeadbeefcafebabe1234567890123456789012ef",
+    "0x1234567890abcdef1234567890abcdef12345678",  # This is in RISKY_TOKENS
+)
 
-async def mock_mempool_feed() -> AsyncIterator[dict]:
-    """Yields fake mempool transactions indefinitely."""
-    mock_addresses = [
-        "0x742637a99b4b5a1a7c0b7c6b4ae6e8b8b73c7d8e",
-        "0xa1b2c3d4e5f6789012345678901234567890abcd",
-        "0xdeadbeefcafebabe1234567890123456789012ef",
-        "0x1234567890abcdef1234567890abcdef12345678",  # This is in RISKY_TOKENS
-    ]
+MOCK_TOKEN_PAIRS = ("WETH/USDC", "WETH/DAI", "USDC/DAI", "WBTC/WETH")
 
-    mock_token_pairs = ["WETH/USDC", "WETH/DAI", "USDC/DAI", "WBTC/WETH"]
+MOCK_DIRECTIONS = ("buy", "sell")
 
-    while True:
-        tx_type = random.choice(MOCK_TX_TYPES)
-        base_tx = {
-            "hash": f"0x{random.getrandbits(256):064x}",
-            "type": tx_type,
-            "value": random.uniform(0.01, 100),
-            "from": random.choice(mock_addresses),
-            "to": random.choice(mock_addresses),
-        }
-
-        # Add type-specific fields
-        if tx_type == "approve":
-            base_tx.update(
-                {
-                    "token_address": random.choice(mock_addresses),
-                    "allowance": random.choice(
-                        [
-                            random.uniform(1, 1000),  # Normal allowance
-                            random.uniform(1000, 100000)
-                            * 10**18,  # Large allowance (triggers alert)
-                        ]
-                    ),
-                }
+# Processed-tx counts are pushed to Prometheus once per this many txs
+COUNTER_FLUSH_INTERVAL = 100
+
+_TX_COUNTERS = {
+    tx_cls: tx_processed_total.labels(tx_type=tx_cls.__struct_config__.tag)
+    for tx_cls in MOCK_TX_TYPES
+}
+
+_rng = np.random.default_rng()
+
+
+def _mock_tx_batch(size: int) -> Iterator[Transaction]:
+    """Yield ``size`` fake transactions from one batch of vectorised draws."""
+    # Columns are converted to plain Python lists once so the per-tx loop
+    # only does list indexing and yields native ints/floats/strs
+    hashes = _rng.bytes(32 * size).hex()
+    fan_out_addresses = _rng.bytes(20 * size).hex()
+    tx_types = _rng.integers(len(MOCK_TX_TYPES), size=size).tolist()
+    values = _rng.uniform(0.01, 100, size=size).tolist()
+    senders = _rng.integers(len(MOCK_ADDRESSES), size=size).tolist()
+    recipients = _rng.integers(len(MOCK_ADDRESSES), size=size).tolist()
+    tokens = _rng.integers(len(MOCK_ADDRESSES), size=size).tolist()
+    allowances = np.where(
+        _rng.random(size) < 0.5,
+        _rng.uniform(1, 1000, size=size),  # Normal allowance
+        _rng.uniform(1000, 100000, size=size) * 10**18,  # Large (triggers alert)
+    ).tolist()
+    pairs = _rng.integers(len(MOCK_TOKEN_PAIRS), size=size).tolist()
+    directions = _rng.integers(len(MOCK_DIRECTIONS), size=size).tolist()
+    amounts_in = _rng.uniform(0.1, 10, size=size).tolist()
+    amounts_out = _rng.uniform(0.1, 10, size=size).tolist()
+    # Occasionally create fan-out patterns for anomalous transfer detection
+    fan_outs = (_rng.random(size) < 0.05).tolist()  # 5% chance of fan-out
+
+    for i in range(size):
+        tx_cls = MOCK_TX_TYPES[tx_types[i]]
+        tx_hash = "0x" + hashes[64 * i : 64 * (i + 1)]
+        sender = MOCK_ADDRESSES[senders[i]]
+        recipient = MOCK_ADDRESSES[recipients[i]]
+
+        # Build the type-specific record
+        if tx_cls is SwapTx:
+            yield SwapTx(
+                hash=tx_hash,
+                value=values[i],
+                from_=sender,
+                to=recipient,
+                token_pair=MOCK_TOKEN_PAIRS[pairs[i]],
+                direction=MOCK_DIRECTIONS[directions[i]],
+                amount_in=amounts_in[i],
+                amount_out=amounts_out[i],
             )
-        elif tx_type == "swap":
-            base_tx.update(
-                {
-                    "token_pair": random.choice(mock_token_pairs),
-                    "direction": random.choice(["buy", "sell"]),
-                    "amount_in": random.uniform(0.1, 10),
-                    "amount_out": random.uniform(0.1, 10),
-                }
+        elif tx_cls is ApproveTx:
+            yield ApproveTx(
+                hash=tx_hash,
+                value=values[i],
+                from_=sender,
+                to=recipient,
+                token_address=MOCK_ADDRESSES[tokens[i]],
+                allowance=allowances[i],
             )
-        elif tx_type == "transfer":
-            # Occasionally create fan-out patterns for anomalous transfer detection
-            if random.random() < 0.05:  # 5% chance of fan-out
-                base_tx[
-                    "to"
-                ] = f"0x{random.getrandbits(160):040x}"  # Random new address
+        else:
+            if fan_outs[i]:
+                # Random new address
+                recipient = "0x" + fan_out_addresses[40 * i : 40 * (i + 1)]
+            yield TransferTx(hash=tx_hash, value=values[i], from_=sender, to=recipient)
 
-        yield base_tx
-        await asyncio.sleep(0.05)  # 20 tx/s
+
+async def mock_mempool_feed(
+    batch_size: int = 100, target_tps: float = 20.0
+) -> AsyncIterator[Transaction]:
+    """Yields fake mempool transactions indefinitely.
+
+    Transactions arrive in bursts of ``batch_size``, paced so the average
+    rate is ``target_tps``; this wakes the event loop once per burst rather
+    than once per transaction.
+    """
+    loop = asyncio.get_running_loop()
+    interval = batch_size / target_tps
+    while True:
+        started = loop.time()
+        for tx in _mock_tx_batch(batch_size):
+            yield tx
+        await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+
+
+def _flush_tx_counts(pending: dict[type, int]) -> None:
+    """Add the locally accumulated processed-tx counts to Prometheus."""
+    for tx_cls, count in pending.items():
+        if count:
+            _TX_COUNTERS[tx_cls].inc(count)
+            pending[tx_cls] = 0
 
 
 async def start_stream_processor(redis: Redis) -> None:
     """Consume the mempool feed and pass each tx through the rule engine."""
     logger.info("Starting stream processor")
 
+    try:
+        await load_scripts(redis)
+    except RedisError as e:
+        # Rules load scripts lazily on first use, so this is not fatal
+        logger.warning("Could not preload Lua scripts", error=str(e))
+
+    pending = dict.fromkeys(_TX_COUNTERS, 0)
+    processed = 0
+
     with tracer.start_as_current_span("stream_processor"):
-        async for tx in mock_mempool_feed():
-            with tracer.start_as_current_span("process_transaction") as span:
-                span.set_attribute("tx.hash", tx["hash"])
-                span.set_attribute("tx.type", tx["type"])
-
-                try:
-                    await evaluate_rules(tx, redis)
-                    tx_processed_total.labels(tx_type=tx["type"]).inc()
-                    span.set_attribute("status", "success")
-                except Exception as e:
-                    logger.error(
-                        "Error processing transaction", tx_hash=tx["hash"], error=str(e)
-                    )
-                    span.set_attribute("status", "error")
-                    span.set_attribute("error", str(e))
+        try:
+            async for tx in mock_mempool_feed():
+                with tracer.start_as_current_span("process_transaction") as span:
+                    span.set_attribute("tx.hash", tx.hash)
+                    span.set_attribute("tx.type", tx_type(tx))
+
+                    try:
+                        await evaluate_rules(tx, redis)
+                        pending[type(tx)] += 1
+                        span.set_attribute("status", "success")
+                    except Exception as e:
+                        logger.error(
+                            "Error processing transaction",
+                            tx_hash=tx.hash,
+                            error=str(e),
+                        )
+                        span.set_attribute("status", "error")
+                        span.set_attribute("error", str(e))
+
+                processed += 1
+                if processed % COUNTER_FLUSH_INTERVAL == 0:
+                    _flush_tx_counts(pending)
+        finally:
+            _flush_tx_counts(pending)
@@ -0,0 +1,17 @@
+"""Shared pytest fixtures."""
+
+import asyncio
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Run async tests on uvloop, matching the production server loop."""
+    if sys.platform == "win32":
+        return asyncio.DefaultEventLoopPolicy()
+
+    import uvloop
+
+    return uvloop.EventLoopPolicy()
@@ -6,6 +6,7 @@ from fastapi.testclient import TestClient
 import redis.asyncio as redis
 
 from app.main import app
+from app.processor.models import ApproveTx, SwapTx, TransferTx
 from app.processor.rules import (
     RULE_ID_SUSPICIOUS_APPROVAL,
     LARGE_ALLOWANCE_THRESHOLD,
@@ -33,12 +34,11 @@ class TestE2E:
 
             # Mock the stream processor to inject a specific transaction
             risky_token = list(RISKY_TOKENS)[0]
-            test_tx = {
-                "type": "approve",
-                "hash": "0xtest123",
-                "allowance": LARGE_ALLOWANCE_THRESHOLD + 1,
-                "token_address": risky_token,
-            }
+            test_tx = ApproveTx(
+                hash="0xtest123",
+                allowance=LARGE_ALLOWANCE_THRESHOLD + 1,
+                token_address=risky_token,
+            )
 
             # Import and run the rule directly (simulating stream processing)
             from app.processor.rules import evaluate_rules
@@ -48,7 +48,7 @@ class TestE2E:
             # Check that the alert was stored in Redis
             from app.processor.rules import _generate_alert_id
 
-            alert_id = _generate_alert_id(RULE_ID_SUSPICIOUS_APPROVAL, test_tx["hash"])
+            alert_id = _generate_alert_id(RULE_ID_SUSPICIOUS_APPROVAL, test_tx.hash)
             alert_exists = await test_redis.get(alert_id)
 
             assert alert_exists == "1", "Alert should be stored in Redis"
@@ -100,12 +100,11 @@ class TestE2E:
             test_transactions = []
             for i in range(5):
                 test_transactions.append(
-                    {
-                        "type": "approve",
-                        "hash": f"0xtest{i}",
-                        "allowance": LARGE_ALLOWANCE_THRESHOLD + 1,
-                        "token_address": list(RISKY_TOKENS)[0],
-                    }
+                    ApproveTx(
+                        hash=f"0xtest{i}",
+                        allowance=LARGE_ALLOWANCE_THRESHOLD + 1,
+                        token_address=list(RISKY_TOKENS)[0],
+                    )
                 )
 
             # Process them concurrently
@@ -118,9 +117,9 @@ class TestE2E:
             from app.processor.rules import _generate_alert_id
 
             for tx in test_transactions:
-                alert_id = _generate_alert_id(RULE_ID_SUSPICIOUS_APPROVAL, tx["hash"])
+                alert_id = _generate_alert_id(RULE_ID_SUSPICIOUS_APPROVAL, tx.hash)
                 alert_exists = await test_redis.get(alert_id)
-                assert alert_exists == "1", f"Alert for {tx['hash']} should exist"
+                assert alert_exists == "1", f"Alert for {tx.hash} should exist"
 
         finally:
             await test_redis.flushdb()
@@ -136,24 +135,9 @@ class TestE2E:
 
             # Create a sequence of swaps that simulate a sandwich attack
             swap_transactions = [
-                {
-                    "type": "swap",
-                    "hash": "0xfront_run",
-                    "token_pair": "WETH/USDC",
-                    "direction": "buy",
-                },
-                {
-                    "type": "swap",
-                    "hash": "0xvictim",
-                    "token_pair": "WETH/USDC",
-                    "direction": "sell",
-                },
-                {
-                    "type": "swap",
-                    "hash": "0xback_run",
-                    "token_pair": "WETH/USDC",
-                    "direction": "buy",
-                },
+                SwapTx(hash="0xfront_run", token_pair="WETH/USDC", direction="buy"),
+                SwapTx(hash="0xvictim", token_pair="WETH/USDC", direction="sell"),
+                SwapTx(hash="0xback_run", token_pair="WETH/USDC", direction="buy"),
             ]
 
             from app.processor.rules import (
@@ -167,8 +151,8 @@ class TestE2E:
 
             # Check if sandwich pattern was detected
             # Note: This might not always trigger due to timing, so we check if data was stored
-            swap_key = f"swaps:{swap_transactions[0]['token_pair']}"
-            stored_swaps = await test_redis.zrange(swap_key, 0, -1)
+            swap_key = f"swaps:{swap_transactions[0].token_pair}"
+            stored_swaps = await test_redis.lrange(swap_key, 0, -1)
             assert len(stored_swaps) > 0, "Swap data should be stored in Redis"
 
         finally:
@@ -189,12 +173,9 @@ class TestE2E:
             transfer_transactions = []
             for i in range(15):  # Above the threshold of 10
                 transfer_transactions.append(
-                    {
-                        "type": "transfer",
-                        "hash": f"0xtransfer{i}",
-                        "from": sender,
-                        "to": f"0xrecipient{i}",
-                    }
+                    TransferTx(
+                        hash=f"0xtransfer{i}", from_=sender, to=f"0xrecipient{i}"
+                    )
                 )
 
             from app.processor.rules import (
@@ -210,14 +191,14 @@ class TestE2E:
             # Check if anomalous pattern was detected
             # The alert should be on the transaction that pushed us over the threshold
             for tx in transfer_transactions[-5:]:  # Check last few transactions
-                alert_id = _generate_alert_id(RULE_ID_ANOMALOUS_TRANSFER, tx["hash"])
+                alert_id = _generate_alert_id(RULE_ID_ANOMALOUS_TRANSFER, tx.hash)
                 alert_exists = await test_redis.get(alert_id)
                 if alert_exists:
                     break
             else:
                 # At minimum, check that recipient data was tracked
-                sender_key = f"transfers:{sender}"
-                recipient_count = await test_redis.scard(sender_key)
+                sender_key = f"transfers:{{{sender}}}"
+                recipient_count = await test_redis.pfcount(sender_key)
                 assert recipient_count > 10, "Should track multiple recipients"
 
         finally:
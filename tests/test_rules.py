@@ -1,9 +1,14 @@
 """Unit tests for fraud detection rules."""
 
+import asyncio
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
+from prometheus_client import REGISTRY
 from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
 
+from app.processor.models import ApproveTx, SwapTx, Transaction, TransferTx
+from app.processor import rules
 from app.processor.rules import (
     _approval_rule,
     _sandwich_risk_rule,
@@ -11,97 +16,141 @@ from app.processor.rules import (
     evaluate_rules,
     LARGE_ALLOWANCE_THRESHOLD,
     RISKY_TOKENS,
+    RULE_ID_SUSPICIOUS_APPROVAL,
+    RULE_ID_SANDWICH_RISK,
+    RULE_ID_ANOMALOUS_TRANSFER,
     _generate_alert_id,
+    _has_mixed_directions,
+    load_scripts,
 )
 
 
+def _alert_count(rule_id: str) -> float:
+    """Current value of the alerts_total counter for a rule."""
+    return REGISTRY.get_sample_value("alerts_total", {"rule": rule_id}) or 0.0
+
+
+@pytest.fixture(scope="module")
+def shared_redis():
+    """Build the spec'd Redis mock once; introspecting Redis is slow."""
+    return AsyncMock(spec=Redis)
+
+
 @pytest.fixture
-def mock_redis():
-    """Create a mock Redis instance."""
-    redis = AsyncMock(spec=Redis)
-    # Set up async method return values
-    redis.get = AsyncMock(return_value=None)  # No existing alerts by default
-    redis.set = AsyncMock(return_value=True)
-    redis.zadd = AsyncMock(return_value=1)
-    redis.zrangebyscore = AsyncMock(return_value=[])
-    redis.expire = AsyncMock(return_value=True)
-    redis.sadd = AsyncMock(return_value=1)
-    redis.scard = AsyncMock(return_value=1)
+def mock_redis(shared_redis):
+    """Reset the shared mock Redis instance to its defaults."""
+    redis = shared_redis
+    redis.reset_mock(return_value=True, side_effect=True)
+    # redis-py declares these as plain defs, so the spec makes them sync;
+    # replace them with fresh async mocks on every test
+    redis.set = AsyncMock(return_value=True)  # SET NX claims by default
+    redis.evalsha = AsyncMock(return_value=[])  # Sliding-window script reply
+    redis.script_load = AsyncMock(return_value="sha")
+    # reset_mock keeps nested return values, so start each test on a new one
+    redis.pipeline = MagicMock()
     return redis
 
 
+@pytest.fixture(scope="session")
+def a_risky_token():
+    """Any address from the risky token list."""
+    return next(iter(RISKY_TOKENS))
+
+
+@pytest.fixture(params=[1, 4])
+def key_shards(request, monkeypatch):
+    """Run a test with window keys unsharded and split over several shards."""
+    monkeypatch.setattr(rules, "KEY_SHARDS", request.param)
+    rules._swap_keys.cache_clear()
+    rules._transfer_keys.cache_clear()
+    yield request.param
+    rules._swap_keys.cache_clear()
+    rules._transfer_keys.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_recent_alerts():
+    """Start every test with an empty in-process alert cache."""
+    rules._recent_alerts.clear()
+    yield
+    rules._recent_alerts.clear()
+
+
 class TestApprovalRule:
     """Tests for the suspicious approval rule."""
 
     @pytest.mark.asyncio
     async def test_ignores_non_approve_transactions(self, mock_redis):
         """Should ignore transactions that are not approvals."""
-        tx = {"type": "transfer", "hash": "0x123"}
+        tx = TransferTx(hash="0x123")
 
         await _approval_rule(tx, mock_redis)
 
-        mock_redis.get.assert_not_called()
         mock_redis.set.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_skips_duplicate_alerts(self, mock_redis):
         """Should skip alerts that already exist (idempotency)."""
-        mock_redis.get.return_value = "1"  # Alert already exists
+        mock_redis.set.return_value = None  # SET NX miss: alert already exists
 
-        tx = {
-            "type": "approve",
-            "hash": "0x123",
-            "allowance": LARGE_ALLOWANCE_THRESHOLD + 1,
-        }
+        tx = ApproveTx(hash="0x123", allowance=LARGE_ALLOWANCE_THRESHOLD + 1)
 
+        before = _alert_count(RULE_ID_SUSPICIOUS_APPROVAL)
         await _approval_rule(tx, mock_redis)
 
-        mock_redis.set.assert_not_called()
+        mock_redis.set.assert_called_once()
+        assert _alert_count(RULE_ID_SUSPICIOUS_APPROVAL) == before
+
+    @pytest.mark.asyncio
+    async def test_repeat_alert_skips_redis(self, mock_redis):
+        """A repeat of a tx this process already alerted on never reaches Redis."""
+        tx = ApproveTx(hash="0x123", allowance=LARGE_ALLOWANCE_THRESHOLD + 1)
+
+        before = _alert_count(RULE_ID_SUSPICIOUS_APPROVAL)
+        await _approval_rule(tx, mock_redis)
+        await _approval_rule(tx, mock_redis)
+
+        mock_redis.set.assert_called_once()
+        assert _alert_count(RULE_ID_SUSPICIOUS_APPROVAL) == before + 1
 
     @pytest.mark.asyncio
     async def test_alerts_on_large_allowance(self, mock_redis):
         """Should alert when allowance exceeds threshold."""
-        tx = {
-            "type": "approve",
-            "hash": "0x123",
-            "allowance": LARGE_ALLOWANCE_THRESHOLD + 1,
-            "token_address": "0xsafe_token",
-        }
+        tx = ApproveTx(
+            hash="0x123",
+            allowance=LARGE_ALLOWANCE_THRESHOLD + 1,
+            token_address="0xsafe_token",
+        )
 
         await _approval_rule(tx, mock_redis)
 
         mock_redis.set.assert_called_once()
         call_args = mock_redis.set.call_args
-        assert call_args[0][1] == "1"  # Value
+        assert call_args[0][1] == b"1"  # Value
         assert call_args[1]["ex"] == 60  # TTL
+        assert call_args[1]["nx"] is True  # Claim only if not already alerted
 
     @pytest.mark.asyncio
-    async def test_alerts_on_risky_token(self, mock_redis):
+    async def test_alerts_on_risky_token(self, mock_redis, a_risky_token):
         """Should alert when token is in risky list."""
-        risky_token = list(RISKY_TOKENS)[0]
-
-        tx = {
-            "type": "approve",
-            "hash": "0x123",
-            "allowance": 100,  # Small allowance
-            "token_address": risky_token,
-        }
+        tx = ApproveTx(
+            hash="0x123",
+            allowance=100,  # Small allowance
+            token_address=a_risky_token,
+        )
 
         await _approval_rule(tx, mock_redis)
 
         mock_redis.set.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_alerts_on_both_conditions(self, mock_redis):
+    async def test_alerts_on_both_conditions(self, mock_redis, a_risky_token):
         """Should alert when both large allowance and risky token."""
-        risky_token = list(RISKY_TOKENS)[0]
-
-        tx = {
-            "type": "approve",
-            "hash": "0x123",
-            "allowance": LARGE_ALLOWANCE_THRESHOLD + 1,
-            "token_address": risky_token,
-        }
+        tx = ApproveTx(
+            hash="0x123",
+            allowance=LARGE_ALLOWANCE_THRESHOLD + 1,
+            token_address=a_risky_token,
+        )
 
         await _approval_rule(tx, mock_redis)
 
@@ -110,12 +159,11 @@ class TestApprovalRule:
     @pytest.mark.asyncio
     async def test_no_alert_on_safe_conditions(self, mock_redis):
         """Should not alert when conditions are safe."""
-        tx = {
-            "type": "approve",
-            "hash": "0x123",
-            "allowance": 100,  # Small allowance
-            "token_address": "0xsafe_token",
-        }
+        tx = ApproveTx(
+            hash="0x123",
+            allowance=100,  # Small allowance
+            token_address="0xsafe_token",
+        )
 
         await _approval_rule(tx, mock_redis)
 
@@ -128,59 +176,86 @@ class TestSandwichRiskRule:
     @pytest.mark.asyncio
     async def test_ignores_non_swap_transactions(self, mock_redis):
         """Should ignore transactions that are not swaps."""
-        tx = {"type": "approve", "hash": "0x123"}
+        tx = ApproveTx(hash="0x123")
 
         await _sandwich_risk_rule(tx, mock_redis)
 
-        mock_redis.zadd.assert_not_called()
+        mock_redis.evalsha.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_stores_swap_data(self, mock_redis):
-        """Should store swap data in Redis sorted set."""
-        tx = {
-            "type": "swap",
-            "hash": "0x123",
-            "token_pair": "WETH/USDC",
-            "direction": "buy",
-        }
+        """Should push swap data onto the pair's capped history."""
+        tx = SwapTx(hash="0x123", token_pair="WETH/USDC", direction="buy")
 
         await _sandwich_risk_rule(tx, mock_redis)
 
-        mock_redis.zadd.assert_called_once()
-        mock_redis.expire.assert_called_once()
+        mock_redis.evalsha.assert_awaited_once()
+        args = mock_redis.evalsha.call_args[0]
+        assert args[1:3] == (1, b"swaps:WETH/USDC")
+        assert args[3].startswith("b|0x123|")
+        assert args[5:] == (b"30", b"10")  # Window seconds, history length
 
     @pytest.mark.asyncio
-    async def test_alerts_on_sandwich_pattern(self, mock_redis):
+    async def test_alerts_on_sandwich_pattern(self, mock_redis, key_shards):
         """Should alert when sandwich pattern is detected."""
         # Mock multiple swaps with different directions
-        mock_redis.zrangebyscore.return_value = [
-            "0x111:buy:1234567890",
-            "0x222:sell:1234567891",
-            "0x333:buy:1234567892",
+        mock_redis.evalsha.return_value = [
+            "b|0x111|1234567890",
+            "s|0x222|1234567891",
+            "b|0x333|1234567892",
         ]
 
-        tx = {
-            "type": "swap",
-            "hash": "0x123",
-            "token_pair": "WETH/USDC",
-            "direction": "sell",
-        }
+        tx = SwapTx(hash="0x123", token_pair="WETH/USDC", direction="sell")
 
         await _sandwich_risk_rule(tx, mock_redis)
 
+        # One window script per shard, only one of which records the swap
+        assert mock_redis.evalsha.await_count == key_shards
+        recorded = [c for c in mock_redis.evalsha.call_args_list if c[0][3]]
+        assert len(recorded) == 1
         mock_redis.set.assert_called_once()
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("key_shards", [4], indirect=True)
+    async def test_sharded_history_keeps_newest_swaps(self, mock_redis, key_shards):
+        """Should merge shard histories down to the newest swaps overall."""
+        # Four newest-first shards whose timestamps interleave: 100 down to 85
+        mock_redis.evalsha.side_effect = [
+            [b"b|0x%d%d|%d" % (shard, i, 100 - 4 * i - shard) for i in range(4)]
+            for shard in range(key_shards)
+        ]
+
+        swaps = await rules._fan_out_swaps(
+            mock_redis, rules._swap_keys("WETH/USDC"), 0, "b|0x123|100", 100
+        )
+
+        times = [rules._swap_time(swap) for swap in swaps]
+        assert times == list(range(100, 100 - rules.SWAP_HISTORY_LEN, -1))
+
+    @pytest.mark.asyncio
+    async def test_skips_duplicate_sandwich_alerts(self, mock_redis):
+        """Should not re-alert when the alert key is already claimed."""
+        mock_redis.set.return_value = None  # SET NX miss
+        mock_redis.evalsha.return_value = [
+            "b|0x111|1234567890",
+            "s|0x222|1234567891",
+            "b|0x333|1234567892",
+        ]
+
+        tx = SwapTx(hash="0x123", token_pair="WETH/USDC", direction="sell")
+
+        before = _alert_count(RULE_ID_SANDWICH_RISK)
+        await _sandwich_risk_rule(tx, mock_redis)
+
+        mock_redis.set.assert_called_once()
+        assert _alert_count(RULE_ID_SANDWICH_RISK) == before
+
     @pytest.mark.asyncio
     async def test_no_alert_with_insufficient_swaps(self, mock_redis):
         """Should not alert with insufficient swap count."""
-        mock_redis.zrangebyscore.return_value = ["0x111:buy:1234567890"]
+        mock_redis.evalsha.return_value = ["b|0x111|1234567890"]
 
-        tx = {
-            "type": "swap",
-            "hash": "0x123",
-            "token_pair": "WETH/USDC",
-            "direction": "sell",
-        }
+        tx = SwapTx(hash="0x123", token_pair="WETH/USDC", direction="sell")
 
         await _sandwich_risk_rule(tx, mock_redis)
 
@@ -189,18 +264,13 @@ class TestSandwichRiskRule:
     @pytest.mark.asyncio
     async def test_no_alert_with_same_direction(self, mock_redis):
         """Should not alert when all swaps are same direction."""
-        mock_redis.zrangebyscore.return_value = [
-            "0x111:buy:1234567890",
-            "0x222:buy:1234567891",
-            "0x333:buy:1234567892",
+        mock_redis.evalsha.return_value = [
+            "b|0x111|1234567890",
+            "b|0x222|1234567891",
+            "b|0x333|1234567892",
         ]
 
-        tx = {
-            "type": "swap",
-            "hash": "0x123",
-            "token_pair": "WETH/USDC",
-            "direction": "buy",
-        }
+        tx = SwapTx(hash="0x123", token_pair="WETH/USDC", direction="buy")
 
         await _sandwich_risk_rule(tx, mock_redis)
 
@@ -213,92 +283,220 @@ class TestAnomalousTransferRule:
     @pytest.mark.asyncio
     async def test_ignores_non_transfer_transactions(self, mock_redis):
         """Should ignore transactions that are not transfers."""
-        tx = {"type": "swap", "hash": "0x123"}
+        tx = SwapTx(hash="0x123")
 
         await _anomalous_transfer_rule(tx, mock_redis)
 
-        mock_redis.sadd.assert_not_called()
+        mock_redis.evalsha.assert_not_called()
 
     @pytest.mark.asyncio
     async def test_tracks_recipients(self, mock_redis):
         """Should track recipients for sender."""
-        tx = {
-            "type": "transfer",
-            "hash": "0x123",
-            "from": "0xsender",
-            "to": "0xrecipient",
-        }
+        mock_redis.evalsha.return_value = [1, 0]
+
+        tx = TransferTx(hash="0x123", from_="0xsender", to="0xrecipient")
 
         await _anomalous_transfer_rule(tx, mock_redis)
 
-        mock_redis.sadd.assert_called_once_with("transfers:0xsender", "0xrecipient")
-        mock_redis.expire.assert_called_once()
+        mock_redis.evalsha.assert_awaited_once()
+        args = mock_redis.evalsha.call_args[0]
+        assert args[1:5] == (
+            2,
+            b"transfers:{0xsender}",
+            b"transfers:n:{0xsender}",
+            "0xrecipient",
+        )
 
     @pytest.mark.asyncio
-    async def test_alerts_on_fan_out_pattern(self, mock_redis):
+    async def test_alerts_on_fan_out_pattern(self, mock_redis, key_shards):
         """Should alert when sender has too many unique recipients."""
-        mock_redis.scard.return_value = 15  # Above threshold (10)
+        mock_redis.evalsha.return_value = [15, 1]  # Above threshold (10)
+
+        tx = TransferTx(hash="0x123", from_="0xsender", to="0xrecipient")
+
+        await _anomalous_transfer_rule(tx, mock_redis)
+
+        assert mock_redis.evalsha.await_count == key_shards
+        mock_redis.set.assert_called_once()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("key_shards", [4], indirect=True)
+    async def test_sums_recipients_across_shards(self, mock_redis, key_shards):
+        """Should alert on the total across shards, not any single shard."""
+        mock_redis.evalsha.return_value = [3, 0]  # Below threshold per shard
+
+        tx = TransferTx(hash="0x123", from_="0xsender", to="0xrecipient")
+
+        await _anomalous_transfer_rule(tx, mock_redis)
+
+        keys = {c[0][2] for c in mock_redis.evalsha.call_args_list}
+        assert keys == {b"transfers:{0xsender:%d}" % shard for shard in range(4)}
+        mock_redis.set.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_skips_duplicate_fan_out_alerts(self, mock_redis):
+        """Should not re-alert when the alert key is already claimed."""
+        mock_redis.set.return_value = None  # SET NX miss
+        mock_redis.evalsha.return_value = [15, 1]
 
-        tx = {
-            "type": "transfer",
-            "hash": "0x123",
-            "from": "0xsender",
-            "to": "0xrecipient",
-        }
+        tx = TransferTx(hash="0x123", from_="0xsender", to="0xrecipient")
 
+        before = _alert_count(RULE_ID_ANOMALOUS_TRANSFER)
         await _anomalous_transfer_rule(tx, mock_redis)
 
         mock_redis.set.assert_called_once()
+        mock_redis.get.assert_not_called()
+        assert _alert_count(RULE_ID_ANOMALOUS_TRANSFER) == before
 
     @pytest.mark.asyncio
     async def test_no_alert_with_low_recipient_count(self, mock_redis):
         """Should not alert with low recipient count."""
-        mock_redis.scard.return_value = 5  # Below threshold
+        mock_redis.evalsha.return_value = [5, 0]  # Below threshold
+
+        tx = TransferTx(hash="0x123", from_="0xsender", to="0xrecipient")
+
+        await _anomalous_transfer_rule(tx, mock_redis)
+
+        mock_redis.set.assert_not_called()
 
-        tx = {
-            "type": "transfer",
-            "hash": "0x123",
-            "from": "0xsender",
-            "to": "0xrecipient",
-        }
+    @pytest.mark.asyncio
+    async def test_no_alert_for_known_recipient(self, mock_redis):
+        """Should not alert when the script skipped counting a repeat recipient."""
+        mock_redis.evalsha.return_value = [0, 0]  # PFADD changed nothing
+
+        tx = TransferTx(hash="0x123", from_="0xsender", to="0xrecipient")
 
         await _anomalous_transfer_rule(tx, mock_redis)
 
+        mock_redis.evalsha.assert_awaited_once()
         mock_redis.set.assert_not_called()
 
+    @pytest.mark.asyncio
+    async def test_loads_script_on_cache_miss(self, mock_redis):
+        """Should load the Lua script and retry when Redis reports NOSCRIPT."""
+        mock_redis.evalsha.side_effect = [NoScriptError("NOSCRIPT"), [1, 0]]
+
+        tx = TransferTx(hash="0x123", from_="0xsender", to="0xrecipient")
+
+        await _anomalous_transfer_rule(tx, mock_redis)
+
+        mock_redis.script_load.assert_awaited_once()
+        assert mock_redis.evalsha.await_count == 2
+
     @pytest.mark.asyncio
     async def test_handles_missing_addresses(self, mock_redis):
         """Should handle transactions with missing from/to addresses."""
-        tx = {
-            "type": "transfer",
-            "hash": "0x123",
-            # Missing from/to addresses
-        }
+        tx = TransferTx(hash="0x123")  # Missing from/to addresses
 
         await _anomalous_transfer_rule(tx, mock_redis)
 
-        mock_redis.sadd.assert_not_called()
+        mock_redis.evalsha.assert_not_called()
 
 
 class TestEvaluateRules:
     """Tests for the main rule evaluation function."""
 
     @pytest.mark.asyncio
-    async def test_runs_all_rules(self, mock_redis):
+    async def test_runs_all_rules(self, mock_redis, a_risky_token):
         """Should run all rules for a transaction."""
-        tx = {
-            "type": "approve",
-            "hash": "0x123",
-            "allowance": LARGE_ALLOWANCE_THRESHOLD + 1,
-            "token_address": list(RISKY_TOKENS)[0],
-        }
+        tx = ApproveTx(
+            hash="0x123",
+            allowance=LARGE_ALLOWANCE_THRESHOLD + 1,
+            token_address=a_risky_token,
+        )
 
         await evaluate_rules(tx, mock_redis)
 
         # Should have called Redis operations for the approval rule
-        mock_redis.get.assert_called()
         mock_redis.set.assert_called()
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "tx, window_key, window_reply",
+        [
+            (
+                ApproveTx(hash="0x123", allowance=LARGE_ALLOWANCE_THRESHOLD + 1),
+                None,
+                None,
+            ),
+            (
+                SwapTx(hash="0x123", token_pair="WETH/USDC", direction="buy"),
+                b"swaps:WETH/USDC",
+                [b"b|0x123|1234567890"],  # Only this swap in the window
+            ),
+            (
+                TransferTx(hash="0x123", from_="0xsender", to="0xrecipient"),
+                b"transfers:{0xsender}",
+                [1, 0],  # One recipient, below the fan-out threshold
+            ),
+        ],
+    )
+    async def test_only_runs_matching_rule(
+        self, mock_redis, tx, window_key, window_reply
+    ):
+        """Should only run the rule for the transaction's type."""
+        mock_redis.evalsha.return_value = window_reply
+
+        await evaluate_rules(tx, mock_redis)
+
+        if window_key is None:
+            # Approval rule: claims an alert, touches no sliding window
+            mock_redis.evalsha.assert_not_called()
+            mock_redis.set.assert_called_once()
+        else:
+            mock_redis.evalsha.assert_awaited_once()
+            assert mock_redis.evalsha.call_args[0][2] == window_key
+            mock_redis.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ignores_unknown_type(self, mock_redis):
+        """Should not touch Redis for transaction types without a rule."""
+        tx = Transaction(hash="0x123")  # Base record has no rule
+
+        before = REGISTRY.get_sample_value("tx_unknown_type_total") or 0.0
+        await evaluate_rules(tx, mock_redis)
+
+        mock_redis.evalsha.assert_not_called()
+        mock_redis.set.assert_not_called()
+        assert REGISTRY.get_sample_value("tx_unknown_type_total") == before + 1
+
+    @pytest.mark.asyncio
+    async def test_runs_matching_rules_concurrently(self, mock_redis, monkeypatch):
+        """Should run several rules for one tx type concurrently."""
+        released = asyncio.Event()
+
+        async def waiting_rule(tx, redis):
+            await released.wait()
+
+        async def releasing_rule(tx, redis):
+            released.set()
+
+        monkeypatch.setitem(
+            rules._RULES_BY_TYPE, SwapTx, (waiting_rule, releasing_rule)
+        )
+
+        # Sequential awaits would block forever on the first rule
+        await asyncio.wait_for(evaluate_rules(SwapTx(hash="0x123"), mock_redis), 1)
+
+    @pytest.mark.asyncio
+    async def test_rule_failure_does_not_cancel_siblings(self, mock_redis, monkeypatch):
+        """Should let other rules finish, then surface the failure."""
+        finished = []
+
+        async def failing_rule(tx, redis):
+            raise RuntimeError("boom")
+
+        async def slow_rule(tx, redis):
+            await asyncio.sleep(0)
+            finished.append(tx.hash)
+
+        monkeypatch.setitem(rules._RULES_BY_TYPE, SwapTx, (failing_rule, slow_rule))
+
+        with pytest.raises(RuntimeError):
+            await evaluate_rules(SwapTx(hash="0x123"), mock_redis)
+
+        assert finished == ["0x123"]
+
 
 class TestUtilityFunctions:
     """Tests for utility functions."""
@@ -312,8 +510,34 @@ class TestUtilityFunctions:
         alert_id2 = _generate_alert_id(rule_id, tx_hash)
 
         assert alert_id1 == alert_id2
-        assert len(alert_id1) == 16  # Truncated to 16 chars
+        assert len(alert_id1) == 16  # 64-bit digest as hex
 
         # Different inputs should produce different IDs
         alert_id3 = _generate_alert_id("different_rule", tx_hash)
         assert alert_id1 != alert_id3
+
+    def test_has_mixed_directions(self):
+        """Should detect when both buy and sell swaps are present."""
+        assert _has_mixed_directions(["b|0x1|1", "b|0x2|2", "s|0x3|3"])
+        assert not _has_mixed_directions(["b|0x1|1", "b|0x2|2"])
+        assert not _has_mixed_directions(["s|0x1|1", "malformed"])
+        assert not _has_mixed_directions([])
+
+    def test_has_mixed_directions_bytes(self):
+        """Should scan raw bytes replies from a non-decoding client."""
+        assert _has_mixed_directions([b"b|0x1|1", b"s|0x2|2"])
+        assert not _has_mixed_directions([b"s|0x1|1", b"s|0x2|2"])
+        assert _has_mixed_directions([b"", b"b|0x1|1", b"s|0x2|2"])
+
+    @pytest.mark.asyncio
+    async def test_load_scripts_uses_one_round_trip(self, mock_redis):
+        """Should register both Lua scripts in a single pipeline."""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=["sha1", "sha2"])
+        mock_redis.pipeline.return_value.__aenter__.return_value = pipe
+
+        await load_scripts(mock_redis)
+
+        assert pipe.script_load.call_count == 2
+        pipe.execute.assert_awaited_once()
+        mock_redis.script_load.assert_not_called()